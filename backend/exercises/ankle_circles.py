@@ -1,7 +1,104 @@
+import sys
+
 import numpy as np
-from typing import List
+from functools import cached_property, lru_cache
+from typing import Tuple
 import math
-from .base import BaseExercise, ExerciseAnalysis, ExercisePhase
+from .base import BaseExercise, ExerciseAnalysis, ExercisePhase, _keypoint_index, njit, _EMPTY_MSGS
+
+_TWO_OVER_PI = 2.0 / math.pi
+
+# Static feedback tuples, shared across frames (no per-frame allocation);
+# the strings are interned so downstream consumers can identity-compare
+_MSG_NO_VIEW = (sys.intern("Cannot see ankles and knees clearly"),)
+_MSG_SETUP = (
+    (sys.intern("Lift your right foot slightly and prepare to make circles"),),
+    (sys.intern("Lift your left foot slightly and prepare to make circles"),),
+)
+_MSG_QUADRANT = {
+    1: (sys.intern("Moving forward and out"),),
+    2: (sys.intern("Moving back and out"),),
+    3: (sys.intern("Moving back and in"),),
+    4: (sys.intern("Moving forward and in"),),
+}
+_MSG_SWITCH = (sys.intern("Switch to left ankle circles"),)
+
+# Small-int codes for hot comparisons (phase / active side)
+_SETUP = ExercisePhase.SETUP.code
+_ACTIVE = ExercisePhase.ACTIVE.code
+_COOLDOWN = ExercisePhase.COOLDOWN.code
+_RIGHT, _LEFT = 0, 1
+_SIDE_NAMES = ('right', 'left')
+
+# KeypointIndex members frozen as module ints on first use — indexing the
+# SoA arrays with bare ints skips the attribute lookups per frame.
+# _SIDE_KP is (ankle, knee) per side, indexed by _RIGHT/_LEFT.
+_KP_READY = False
+_LEFT_ANKLE = _RIGHT_ANKLE = _LEFT_KNEE = _RIGHT_KNEE = 0
+_SIDE_KP = ((0, 0), (0, 0))
+
+
+def _kp_indices():
+    global _KP_READY, _LEFT_ANKLE, _RIGHT_ANKLE, _LEFT_KNEE, _RIGHT_KNEE, _SIDE_KP
+    KeypointIndex = _keypoint_index()
+    _LEFT_ANKLE = int(KeypointIndex.LEFT_ANKLE)
+    _RIGHT_ANKLE = int(KeypointIndex.RIGHT_ANKLE)
+    _LEFT_KNEE = int(KeypointIndex.LEFT_KNEE)
+    _RIGHT_KNEE = int(KeypointIndex.RIGHT_KNEE)
+    _SIDE_KP = ((_RIGHT_ANKLE, _RIGHT_KNEE), (_LEFT_ANKLE, _LEFT_KNEE))
+    _KP_READY = True
+
+
+@lru_cache(maxsize=64)
+def _circle_msg(n):
+    return (f"Circle {n} complete!",)
+
+
+@lru_cache(maxsize=8)
+def _cooldown_msg(n):
+    return (f"Great job! You completed {n} ankle circles",)
+_QTR_PI = math.pi / 4
+_HALF_PI = math.pi / 2
+
+
+@njit(cache=True)
+def _fast_atan2(y: float, x: float) -> float:
+    """Octant-folded polynomial atan2 approximation (~0.002 rad max error)
+
+    Plenty accurate for quadrant detection while skipping the libm call.
+    """
+    ax = abs(x)
+    ay = abs(y)
+    if ax >= ay:
+        mx, mn = ax, ay
+    else:
+        mx, mn = ay, ax
+    if mx == 0.0:
+        return 0.0
+    t = mn / mx
+    a = t * (_QTR_PI - (t - 1.0) * (0.2447 + 0.0663 * t))
+    if ay > ax:
+        a = _HALF_PI - a
+    if x < 0.0:
+        a = math.pi - a
+    return -a if y < 0.0 else a
+
+
+@njit(cache=True)
+def _ankle_frame(dx: float, dy: float, angle_history: np.ndarray,
+                 ah_idx: int, ah_len: int, record: bool):
+    """Numeric core of one ankle frame: quadrant, angle, ring-buffer write"""
+    if dy >= 0.0:
+        quadrant = 1 + (dx < 0.0)
+    else:
+        quadrant = 3 + (dx >= 0.0)
+    angle = _fast_atan2(dy, dx)
+    if record:
+        angle_history[ah_idx] = angle
+        ah_idx = (ah_idx + 1) % angle_history.shape[0]
+        if ah_len < angle_history.shape[0]:
+            ah_len += 1
+    return angle, quadrant, ah_idx, ah_len
 
 
 class AnkleCirclesExercise(BaseExercise):
@@ -12,13 +109,20 @@ class AnkleCirclesExercise(BaseExercise):
     Timing: 0-2min establish pattern, 2-4min quality check, 4-5min count circles
     """
     
+    ANGLE_HISTORY_SIZE = 100
+
     def __init__(self):
         super().__init__()
-        self.angle_history = []
+        # Fixed-size ring buffer of recent angles (O(1) insert, no list churn)
+        self.angle_history = np.empty(self.ANGLE_HISTORY_SIZE, dtype=np.float32)
+        self._ah_idx = 0
+        self._ah_len = 0
         self.circle_count = 0
         self.last_quadrant = None
-        self.quadrant_visits = []
-        self.active_ankle = 'right'  # Start with right ankle
+        # Last 4 visited quadrants packed into an 8-bit ring (2 bits each)
+        self._q_ring = 0
+        self._q_transitions = 0
+        self.active_ankle = _RIGHT  # Start with right ankle
         
     @property
     def name(self) -> str:
@@ -28,139 +132,150 @@ class AnkleCirclesExercise(BaseExercise):
     def description(self) -> str:
         return "Make circular motions with your ankles"
     
-    @property
-    def required_keypoints(self) -> List[int]:
-        from server import KeypointIndex
-        return [
-            KeypointIndex.LEFT_ANKLE,
-            KeypointIndex.RIGHT_ANKLE,
-            KeypointIndex.LEFT_KNEE,
-            KeypointIndex.RIGHT_KNEE
-        ]
-    
-    def _calculate_ankle_angle(self, ankle, knee):
-        """Calculate angle of ankle relative to knee"""
-        dx = ankle[0] - knee[0]
-        dy = ankle[1] - knee[1]
-        return math.atan2(dy, dx)
-    
-    def _get_quadrant(self, angle):
-        """Get quadrant (1-4) from angle in radians"""
-        # Normalize angle to 0-2π
-        normalized = angle % (2 * math.pi)
-        if normalized < math.pi / 2:
-            return 1
-        elif normalized < math.pi:
-            return 2
-        elif normalized < 3 * math.pi / 2:
-            return 3
-        else:
-            return 4
+    @cached_property
+    def required_keypoints(self) -> Tuple[int, ...]:
+        if not _KP_READY:
+            _kp_indices()
+        return (_LEFT_ANKLE, _RIGHT_ANKLE, _LEFT_KNEE, _RIGHT_KNEE)
     
     def _detect_circle_completion(self, quadrant):
-        """Detect if a full circle has been completed"""
+        """Detect if a full circle has been completed
+
+        On each quadrant transition the new quadrant is shifted into an
+        8-bit ring (2 bits per visit). ORing the four 2-bit lanes into a
+        seen-mask tells in pure integer arithmetic whether the last four
+        visits covered all four quadrants — no list, slice or set.
+        """
         if self.last_quadrant is not None and quadrant != self.last_quadrant:
-            self.quadrant_visits.append(quadrant)
-            
+            r = ((self._q_ring << 2) | (quadrant - 1)) & 0xFF
+            self._q_ring = r
+            self._q_transitions += 1
+
             # Check if we've visited all 4 quadrants in sequence
-            if len(self.quadrant_visits) >= 4:
-                recent_quadrants = self.quadrant_visits[-4:]
-                unique_quadrants = set(recent_quadrants)
-                if len(unique_quadrants) == 4:
+            if self._q_transitions >= 4:
+                seen = ((1 << (r & 3)) | (1 << ((r >> 2) & 3))
+                        | (1 << ((r >> 4) & 3)) | (1 << ((r >> 6) & 3)))
+                if seen == 0b1111:
                     # Full circle detected
+                    self._q_ring = 0
+                    self._q_transitions = 0  # Reset
                     self.circle_count += 1
-                    self.quadrant_visits = []  # Reset
                     return True
-        
+
         self.last_quadrant = quadrant
         return False
     
-    def analyze(self, keypoints: np.ndarray, confidence: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
-        from server import KeypointIndex
-        
+    def analyze(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
+        if not _KP_READY:
+            _kp_indices()
+
         # Update phase
         phase = self.update_phase(elapsed_time)
-        
+
         # Check confidence
-        if not self.check_confidence(confidence, self.required_keypoints):
-            return ExerciseAnalysis(
-                exercise_name=self.name,
-                phase=phase,
-                form_score=0.0,
-                feedback_messages=["Cannot see ankles and knees clearly"],
-                rep_count=self.circle_count,
-                is_proper_position=False,
-                confidence=0.0,
-                exercise_specific_data={}
-            )
-        
-        # Get keypoint positions
-        if self.active_ankle == 'right':
-            ankle = keypoints[KeypointIndex.RIGHT_ANKLE]
-            knee = keypoints[KeypointIndex.RIGHT_KNEE]
-        else:
-            ankle = keypoints[KeypointIndex.LEFT_ANKLE]
-            knee = keypoints[KeypointIndex.LEFT_KNEE]
-        
-        # Calculate ankle angle
-        current_angle = self._calculate_ankle_angle(ankle, knee)
-        current_quadrant = self._get_quadrant(current_angle)
+        if not self.check_confidence(conf):
+            return self._low_confidence_analysis(phase, _MSG_NO_VIEW, self.circle_count)
         
-        feedback_messages = []
+        # Get keypoint indices for the active side
+        ankle_idx, knee_idx = _SIDE_KP[self.active_ankle]
+
+        # Numeric core (JIT-compiled when numba is installed): quadrant from
+        # delta signs, approximate angle, ring-buffer write — the deltas are
+        # scalar loads straight from the SoA arrays
+        phase_code = phase.code
+        record = phase_code == _SETUP or phase_code == _ACTIVE
+        current_angle, current_quadrant, self._ah_idx, self._ah_len = _ankle_frame(
+            float(kx[ankle_idx] - kx[knee_idx]),
+            float(ky[ankle_idx] - ky[knee_idx]),
+            self.angle_history, self._ah_idx, self._ah_len, record
+        )
+        min_conf = float(conf[self._required_idx()].min())
+
+        return self._frame_result(phase, current_angle, current_quadrant, elapsed_time, min_conf)
+
+    def analyze_batch(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, t: np.ndarray) -> list:
+        """Vectorized batch analysis of N frames
+
+        Deltas, quadrants and angles for both ankles are computed over the
+        whole batch with NumPy; the loop only runs the circle state machine
+        on precomputed scalars (picking the active side per frame), so
+        results match sequential analyze().
+        """
+        if not _KP_READY:
+            _kp_indices()
+        sides = []
+        for ankle_idx, knee_idx in _SIDE_KP:
+            dx = kx[:, ankle_idx] - kx[:, knee_idx]
+            dy = ky[:, ankle_idx] - ky[:, knee_idx]
+            quadrants = np.where(dy >= 0.0, 1 + (dx < 0.0), 3 + (dx >= 0.0))
+            sides.append((np.arctan2(dy, dx), quadrants))
+        min_conf = conf[:, self._required_idx()].min(axis=1)
+        ok = min_conf >= self.confidence_threshold
+
+        results = []
+        for i in range(t.shape[0]):
+            elapsed_time = float(t[i])
+            phase = self.update_phase(elapsed_time)
+            if not ok[i]:
+                results.append(self._low_confidence_analysis(phase, _MSG_NO_VIEW, self.circle_count))
+                continue
+            angles, quadrants = sides[self.active_ankle]
+            current_angle = float(angles[i])
+            if phase.code == _SETUP or phase.code == _ACTIVE:
+                self.angle_history[self._ah_idx] = current_angle
+                self._ah_idx = (self._ah_idx + 1) % self.ANGLE_HISTORY_SIZE
+                self._ah_len = min(self._ah_len + 1, self.ANGLE_HISTORY_SIZE)
+            results.append(self._frame_result(
+                phase, current_angle, int(quadrants[i]), elapsed_time, float(min_conf[i])))
+        return results
+
+    def _frame_result(self, phase: ExercisePhase, current_angle: float, current_quadrant: int,
+                      elapsed_time: float, min_conf: float) -> ExerciseAnalysis:
+        """Run the circle state machine on one frame's precomputed scalars"""
+        feedback_messages = _EMPTY_MSGS
         form_score = 70  # Base score
-        
-        if phase == ExercisePhase.SETUP:
-            feedback_messages.append(f"Lift your {self.active_ankle} foot slightly and prepare to make circles")
-            self.angle_history.append(current_angle)
-            
-        elif phase == ExercisePhase.ACTIVE:
-            # Track angle changes
-            self.angle_history.append(current_angle)
-            if len(self.angle_history) > 100:
-                self.angle_history.pop(0)  # Keep last 100 angles
-            
+        phase_code = phase.code
+
+        if phase_code == _SETUP:
+            feedback_messages = _MSG_SETUP[self.active_ankle]
+
+        elif phase_code == _ACTIVE:
             # Detect circle completion
             if self._detect_circle_completion(current_quadrant):
-                feedback_messages.append(f"Circle {self.circle_count} complete!")
+                feedback_messages = _circle_msg(self.circle_count)
                 form_score = 90
             else:
                 # Provide guidance based on quadrant
-                if current_quadrant == 1:
-                    feedback_messages.append("Moving forward and out")
-                elif current_quadrant == 2:
-                    feedback_messages.append("Moving back and out")
-                elif current_quadrant == 3:
-                    feedback_messages.append("Moving back and in")
-                else:
-                    feedback_messages.append("Moving forward and in")
+                feedback_messages = _MSG_QUADRANT[current_quadrant]
                 form_score = 75
-            
+
             # Switch ankles halfway through
-            if elapsed_time > 180 and self.active_ankle == 'right':
-                self.active_ankle = 'left'
+            if elapsed_time > 180 and self.active_ankle == _RIGHT:
+                self.active_ankle = _LEFT
                 self.circle_count = 0  # Reset for left ankle
-                self.quadrant_visits = []
+                self._q_ring = 0
+                self._q_transitions = 0
                 self.last_quadrant = None
-                feedback_messages.append("Switch to left ankle circles")
-                
-        elif phase == ExercisePhase.COOLDOWN:
-            feedback_messages.append(f"Great job! You completed {self.circle_count} ankle circles")
+                feedback_messages = feedback_messages + _MSG_SWITCH
+
+        elif phase_code == _COOLDOWN:
+            feedback_messages = _cooldown_msg(self.circle_count)
             form_score = 85
-        
+
         self.rep_count = self.circle_count
         
         return ExerciseAnalysis(
             exercise_name=self.name,
             phase=phase,
             form_score=form_score,
-            feedback_messages=feedback_messages,
+            feedback_messages=self._dedupe_msgs(feedback_messages),
             rep_count=self.rep_count,
             is_proper_position=True,
-            confidence=min(confidence[self.required_keypoints]) * 100,
+            confidence=min_conf * 100,
             exercise_specific_data={
                 "current_angle": current_angle,
                 "current_quadrant": current_quadrant,
-                "active_ankle": self.active_ankle,
-                "angle_history_length": len(self.angle_history)
+                "active_ankle": _SIDE_NAMES[self.active_ankle],
+                "angle_history_length": self._ah_len
             }
         )
\ No newline at end of file
@@ -1,26 +1,75 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
 from enum import Enum
 import numpy as np
+import bisect
 import math
+from types import MappingProxyType
+
+if TYPE_CHECKING:
+    from server import KeypointIndex
+
+# Optional Numba JIT for the per-frame numeric kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op decorator so the kernels run as plain Python without numba"""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+# Lazily resolved server.KeypointIndex (imported once, avoids circular import)
+_KeypointIndex = None
+
+
+def _keypoint_index():
+    """Resolve server.KeypointIndex on first use and cache it"""
+    global _KeypointIndex
+    if _KeypointIndex is None:
+        from server import KeypointIndex
+        _KeypointIndex = KeypointIndex
+    return _KeypointIndex
+
+
+# Shared empty feedback tuple — returned whenever nothing new happened
+_EMPTY_MSGS: Tuple[str, ...] = ()
+
+# Shared read-only empty payload for analyses that carry no metrics
+_EMPTY_DATA = MappingProxyType({})
 
 
 class ExercisePhase(Enum):
-    NOT_STARTED = "not_started"
-    SETUP = "setup"
-    ACTIVE = "active"
-    COOLDOWN = "cooldown"
-    COMPLETED = "completed"
+    """Exercise phase; each member also carries a small-int .code so the
+    per-frame state machines can branch on plain integer compares instead
+    of Enum equality"""
+    NOT_STARTED = "not_started", 0
+    SETUP = "setup", 1
+    ACTIVE = "active", 2
+    COOLDOWN = "cooldown", 3
+    COMPLETED = "completed", 4
 
+    def __new__(cls, value, code):
+        obj = object.__new__(cls)
+        obj._value_ = value
+        obj.code = code
+        return obj
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class ExerciseAnalysis:
-    """Analysis results for any exercise"""
+    """Analysis results for any exercise (immutable, no per-instance dict)"""
     exercise_name: str
     phase: ExercisePhase
     form_score: float  # 0-100 percentage
-    feedback_messages: List[str]
+    feedback_messages: Sequence[str]
     rep_count: int
     is_proper_position: bool
     confidence: float
@@ -35,11 +84,15 @@ class BaseExercise(ABC):
         self.start_time = None
         self.phase = ExercisePhase.NOT_STARTED
         self.confidence_threshold = 0.6
+        self._req_idx = None  # cached NumPy index array of required_keypoints
+        self._last_msgs = None  # last feedback tuple emitted (for deduping)
+        self._low_conf_cache = None  # reusable frozen low-confidence analysis
         self.phase_durations = {
             ExercisePhase.SETUP: 120,     # 2 minutes
             ExercisePhase.ACTIVE: 120,    # 2 minutes
             ExercisePhase.COOLDOWN: 60,   # 1 minute
         }
+        self._rebuild_phase_boundaries()
     
     @property
     @abstractmethod
@@ -55,56 +108,144 @@ class BaseExercise(ABC):
     
     @property
     @abstractmethod
-    def required_keypoints(self) -> List[int]:
-        """List of required keypoint indices for this exercise"""
+    def required_keypoints(self) -> Tuple[int, ...]:
+        """Required keypoint indices for this exercise (cached per instance)"""
         pass
     
     @abstractmethod
-    def analyze(self, keypoints: np.ndarray, confidence: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
-        """Analyze the exercise based on keypoints"""
+    def analyze(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
+        """Analyze the exercise from SoA keypoint arrays (x, y, confidence)"""
         pass
+
+    def analyze_batch(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, t: np.ndarray) -> List[ExerciseAnalysis]:
+        """Analyze N recorded frames; kx/ky/conf are (N, K), t is (N,)
+
+        Subclasses override this with vectorized implementations; the
+        fallback just replays the frames through analyze().
+        """
+        return [self.analyze(kx[i], ky[i], conf[i], float(t[i])) for i in range(t.shape[0])]
     
+    def _rebuild_phase_boundaries(self):
+        """Precompute cumulative phase end times for update_phase"""
+        bounds = []
+        cumulative_time = 0
+        for duration in self.phase_durations.values():
+            cumulative_time += duration
+            bounds.append(float(cumulative_time))
+        self._phase_bounds = bounds
+        self._phase_order = tuple(self.phase_durations.keys())
+        # Window of the last resolved phase; while elapsed_time stays
+        # inside it update_phase skips the boundary search entirely
+        self._phase_lo = math.inf
+        self._phase_hi = -math.inf
+
     def update_phase(self, elapsed_time: float) -> ExercisePhase:
         """Update exercise phase based on elapsed time"""
         if elapsed_time < 0:
             return ExercisePhase.NOT_STARTED
-        
-        cumulative_time = 0
-        for phase, duration in self.phase_durations.items():
-            cumulative_time += duration
-            if elapsed_time < cumulative_time:
-                self.phase = phase
-                return phase
-        
-        self.phase = ExercisePhase.COMPLETED
-        return ExercisePhase.COMPLETED
+
+        if self._phase_lo <= elapsed_time < self._phase_hi:
+            return self.phase
+
+        i = bisect.bisect_right(self._phase_bounds, elapsed_time)
+        if i >= len(self._phase_order):
+            self.phase = ExercisePhase.COMPLETED
+            self._phase_lo = self._phase_bounds[-1]
+            self._phase_hi = math.inf
+        else:
+            self.phase = self._phase_order[i]
+            self._phase_lo = self._phase_bounds[i - 1] if i else 0.0
+            self._phase_hi = self._phase_bounds[i]
+        return self.phase
     
-    def calculate_distance(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
+    # The trailing defaults bind globals once at def time (LOAD_FAST instead
+    # of a dict lookup per call) — these helpers run in the per-frame path
+    def calculate_distance(self, p1: Tuple[float, float], p2: Tuple[float, float],
+                           _hypot=math.hypot) -> float:
         """Calculate Euclidean distance between two points"""
-        return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
-    
-    def calculate_angle(self, p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[float, float]) -> float:
+        return _hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+    @staticmethod
+    def _cos_angle_sq(p1: Tuple[float, float], p2: Tuple[float, float],
+                      p3: Tuple[float, float]) -> Tuple[float, float]:
+        """Dot product and squared-magnitude product of the angle at p2
+
+        Cheap form for threshold tests: comparing dot*abs(dot) against
+        cos_threshold**2 * magsq (sign-aware) avoids sqrt/acos entirely,
+        and cos_angle_from() recovers the cosine when it is needed.
+        """
+        v1x = p1[0] - p2[0]
+        v1y = p1[1] - p2[1]
+        v2x = p3[0] - p2[0]
+        v2y = p3[1] - p2[1]
+        dot = v1x * v2x + v1y * v2y
+        magsq = (v1x * v1x + v1y * v1y) * (v2x * v2x + v2y * v2y)
+        return dot, magsq
+
+    @staticmethod
+    def cos_angle_from(dot: float, magsq: float, _sqrt=math.sqrt) -> float:
+        """Cosine of the angle from _cos_angle_sq outputs (one sqrt, no acos)"""
+        if magsq == 0:
+            return 1.0
+        return dot / _sqrt(magsq)
+
+    def calculate_angle(self, p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[float, float],
+                        _acos=math.acos, _degrees=math.degrees,
+                        _max=max, _min=min) -> float:
         """Calculate angle between three points (p2 is the vertex)"""
-        v1 = (p1[0] - p2[0], p1[1] - p2[1])
-        v2 = (p3[0] - p2[0], p3[1] - p2[1])
-        
-        dot_product = v1[0] * v2[0] + v1[1] * v2[1]
-        
-        mag1 = math.sqrt(v1[0]**2 + v1[1]**2)
-        mag2 = math.sqrt(v2[0]**2 + v2[1]**2)
-        
-        if mag1 == 0 or mag2 == 0:
+        dot, magsq = self._cos_angle_sq(p1, p2, p3)
+        if magsq == 0:
             return 0
-        
-        cos_angle = dot_product / (mag1 * mag2)
-        cos_angle = max(-1, min(1, cos_angle))
-        angle_rad = math.acos(cos_angle)
-        
-        return math.degrees(angle_rad)
+        cos_angle = _max(-1.0, _min(1.0, self.cos_angle_from(dot, magsq)))
+        return _degrees(_acos(cos_angle))
     
-    def check_confidence(self, confidence: np.ndarray, required_indices: List[int]) -> bool:
+    def _dedupe_msgs(self, msgs: Tuple[str, ...]) -> Tuple[str, ...]:
+        """Suppress a feedback tuple identical to the one last emitted
+
+        The message constants are shared tuples, so an identity check is
+        enough — repeated frames with the same state produce no feedback
+        and no allocations.
+        """
+        if msgs is self._last_msgs:
+            return _EMPTY_MSGS
+        self._last_msgs = msgs
+        return msgs
+
+    def _low_confidence_analysis(self, phase: ExercisePhase, no_view_msgs: Tuple[str, ...], rep_count: int) -> ExerciseAnalysis:
+        """Low-confidence result, reusing a frozen cached instance when possible
+
+        ExerciseAnalysis is frozen, so frames where nothing changed (same
+        phase and rep count, feedback already emitted) can share one object.
+        """
+        msgs = self._dedupe_msgs(no_view_msgs)
+        cached = self._low_conf_cache
+        if (not msgs and cached is not None and cached.phase is phase
+                and cached.rep_count == rep_count):
+            return cached
+        result = ExerciseAnalysis(
+            exercise_name=self.name,
+            phase=phase,
+            form_score=0.0,
+            feedback_messages=msgs,
+            rep_count=rep_count,
+            is_proper_position=False,
+            confidence=0.0,
+            exercise_specific_data=_EMPTY_DATA
+        )
+        if not msgs:
+            self._low_conf_cache = result
+        return result
+
+    def _required_idx(self) -> np.ndarray:
+        """Index array for required_keypoints, built once on first use"""
+        if self._req_idx is None:
+            self._req_idx = np.asarray(self.required_keypoints, dtype=np.intp)
+        return self._req_idx
+
+    def check_confidence(self, confidence: np.ndarray, required_indices: Optional[List[int]] = None) -> bool:
         """Check if required keypoints have sufficient confidence"""
-        for idx in required_indices:
-            if confidence[idx] < self.confidence_threshold:
-                return False
-        return True
\ No newline at end of file
+        if required_indices is None:
+            idx = self._required_idx()
+        else:
+            idx = np.asarray(required_indices, dtype=np.intp)
+        return bool((confidence[idx] >= self.confidence_threshold).all())
\ No newline at end of file
@@ -1,6 +1,74 @@
+import sys
+
 import numpy as np
-from typing import List
-from .base import BaseExercise, ExerciseAnalysis, ExercisePhase
+from functools import cached_property, lru_cache
+from typing import Tuple
+from .base import BaseExercise, ExerciseAnalysis, ExercisePhase, _keypoint_index, njit, _EMPTY_MSGS
+
+# Static feedback tuples, shared across frames (no per-frame allocation);
+# the strings are interned so downstream consumers can identity-compare
+_MSG_NO_VIEW = (sys.intern("Cannot see face and shoulders clearly"),)
+_MSG_SETUP = (sys.intern("Keep your shoulders still, only move your head"),)
+_MSG_HOLD_LEFT = (sys.intern("Good left rotation, now slowly return to center"),)
+_MSG_HOLD_RIGHT = (sys.intern("Good right rotation, now slowly return to center"),)
+_MSG_FOCUS_LEFT = (sys.intern("Focus on rotating to your left for now"),)
+_MSG_FOCUS_RIGHT = (sys.intern("Focus on rotating to your right for now"),)
+_MSG_PROMPT_LEFT = (sys.intern("Now rotate your head to the left"),)
+_MSG_PROMPT_RIGHT = (sys.intern("Now rotate your head to the right"),)
+
+# Small-int codes for hot comparisons (phase / rotation direction)
+_SETUP = ExercisePhase.SETUP.code
+_ACTIVE = ExercisePhase.ACTIVE.code
+_COOLDOWN = ExercisePhase.COOLDOWN.code
+_DIR_NONE, _DIR_LEFT, _DIR_RIGHT = 0, 1, 2
+_DIR_NAMES = (None, 'left', 'right')
+
+# KeypointIndex members frozen as module ints on first use — indexing the
+# SoA arrays with bare ints skips the attribute lookups per frame
+_KP_READY = False
+_NOSE = _LEFT_SHOULDER = _RIGHT_SHOULDER = 0
+
+
+def _kp_indices():
+    global _KP_READY, _NOSE, _LEFT_SHOULDER, _RIGHT_SHOULDER
+    KeypointIndex = _keypoint_index()
+    _NOSE = int(KeypointIndex.NOSE)
+    _LEFT_SHOULDER = int(KeypointIndex.LEFT_SHOULDER)
+    _RIGHT_SHOULDER = int(KeypointIndex.RIGHT_SHOULDER)
+    _KP_READY = True
+
+
+@lru_cache(maxsize=64)
+def _left_rotation_msg(n):
+    return (f"Left rotation {n}",)
+
+
+@lru_cache(maxsize=64)
+def _right_rotation_msg(n):
+    return (f"Right rotation {n}",)
+
+
+@lru_cache(maxsize=8)
+def _cooldown_msg(left, right):
+    return (f"Excellent! {left} left, {right} right rotations",)
+
+
+@njit(cache=True)
+def _neck_frame(nose_x: float, left_shoulder_x: float,
+                right_shoulder_x: float, threshold: float):
+    """Numeric core of one neck frame: nose offset and threshold zone
+
+    Zone codes: -1 = rotated left, 0 = centered, 1 = rotated right.
+    """
+    midpoint_x = (left_shoulder_x + right_shoulder_x) * 0.5
+    offset = nose_x - midpoint_x
+    if offset < -threshold:
+        zone = -1
+    elif offset > threshold:
+        zone = 1
+    else:
+        zone = 0
+    return midpoint_x, offset, zone
 
 
 class NeckRotationsExercise(BaseExercise):
@@ -15,7 +83,7 @@ class NeckRotationsExercise(BaseExercise):
         super().__init__()
         self.shoulder_midpoint_x = None
         self.last_nose_x = None
-        self.rotation_direction = None  # 'left' or 'right'
+        self.rotation_direction = _DIR_NONE  # _DIR_NONE/_DIR_LEFT/_DIR_RIGHT
         self.left_rotations = 0
         self.right_rotations = 0
         self.rotation_threshold = 30  # pixels
@@ -28,109 +96,132 @@ class NeckRotationsExercise(BaseExercise):
     def description(self) -> str:
         return "Slowly rotate your head left and right"
     
-    @property
-    def required_keypoints(self) -> List[int]:
-        from server import KeypointIndex
-        return [
-            KeypointIndex.NOSE,
-            KeypointIndex.LEFT_SHOULDER,
-            KeypointIndex.RIGHT_SHOULDER
-        ]
+    @cached_property
+    def required_keypoints(self) -> Tuple[int, ...]:
+        if not _KP_READY:
+            _kp_indices()
+        return (_NOSE, _LEFT_SHOULDER, _RIGHT_SHOULDER)
     
-    def analyze(self, keypoints: np.ndarray, confidence: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
-        from server import KeypointIndex
-        
+    def analyze(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
+        if not _KP_READY:
+            _kp_indices()
+
         # Update phase
         phase = self.update_phase(elapsed_time)
-        
+
         # Check confidence
-        if not self.check_confidence(confidence, self.required_keypoints):
-            return ExerciseAnalysis(
-                exercise_name=self.name,
-                phase=phase,
-                form_score=0.0,
-                feedback_messages=["Cannot see face and shoulders clearly"],
-                rep_count=self.left_rotations + self.right_rotations,
-                is_proper_position=False,
-                confidence=0.0,
-                exercise_specific_data={}
-            )
-        
-        # Get keypoint positions
-        nose = keypoints[KeypointIndex.NOSE]
-        left_shoulder = keypoints[KeypointIndex.LEFT_SHOULDER]
-        right_shoulder = keypoints[KeypointIndex.RIGHT_SHOULDER]
-        
-        # Calculate shoulder midpoint
-        shoulder_midpoint_x = (left_shoulder[0] + right_shoulder[0]) / 2
+        if not self.check_confidence(conf):
+            return self._low_confidence_analysis(phase, _MSG_NO_VIEW, self.left_rotations + self.right_rotations)
         
-        # Track nose position relative to shoulders
-        nose_offset = nose[0] - shoulder_midpoint_x
-        
-        feedback_messages = []
+        # Numeric core (JIT-compiled when numba is installed): shoulder
+        # midpoint, nose offset and which threshold zone the nose is in —
+        # all scalar loads straight from the SoA x array
+        shoulder_midpoint_x, nose_offset, zone = _neck_frame(
+            float(kx[_NOSE]),
+            float(kx[_LEFT_SHOULDER]),
+            float(kx[_RIGHT_SHOULDER]),
+            float(self.rotation_threshold)
+        )
+        min_conf = float(conf[self._required_idx()].min())
+
+        return self._frame_result(phase, shoulder_midpoint_x, nose_offset, zone, elapsed_time, min_conf)
+
+    def analyze_batch(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, t: np.ndarray) -> list:
+        """Vectorized batch analysis of N frames
+
+        Midpoints, nose offsets and threshold zones are computed over the
+        whole batch with NumPy; the loop only runs the rotation state
+        machine on precomputed scalars, so results match sequential analyze().
+        """
+        if not _KP_READY:
+            _kp_indices()
+        midpoints = (kx[:, _LEFT_SHOULDER] + kx[:, _RIGHT_SHOULDER]) * 0.5
+        offsets = kx[:, _NOSE] - midpoints
+        zones = np.where(offsets < -self.rotation_threshold, -1,
+                         np.where(offsets > self.rotation_threshold, 1, 0))
+        min_conf = conf[:, self._required_idx()].min(axis=1)
+        ok = min_conf >= self.confidence_threshold
+
+        results = []
+        for i in range(t.shape[0]):
+            elapsed_time = float(t[i])
+            phase = self.update_phase(elapsed_time)
+            if not ok[i]:
+                results.append(self._low_confidence_analysis(
+                    phase, _MSG_NO_VIEW, self.left_rotations + self.right_rotations))
+            else:
+                results.append(self._frame_result(
+                    phase, float(midpoints[i]), float(offsets[i]), int(zones[i]),
+                    elapsed_time, float(min_conf[i])))
+        return results
+
+    def _frame_result(self, phase: ExercisePhase, shoulder_midpoint_x: float, nose_offset: float,
+                      zone: int, elapsed_time: float, min_conf: float) -> ExerciseAnalysis:
+        """Run the rotation state machine on one frame's precomputed scalars"""
+        feedback_messages = _EMPTY_MSGS
         form_score = 70  # Base score
-        
-        if phase == ExercisePhase.SETUP:
+        phase_code = phase.code
+
+        if phase_code == _SETUP:
             self.shoulder_midpoint_x = shoulder_midpoint_x
-            feedback_messages.append("Keep your shoulders still, only move your head")
-            
-        elif phase == ExercisePhase.ACTIVE:
+            feedback_messages = _MSG_SETUP
+
+        elif phase_code == _ACTIVE:
             # First half: focus on left rotations
             if elapsed_time < 180:  # First 3 minutes (including setup)
-                if nose_offset < -self.rotation_threshold:
-                    if self.rotation_direction != 'left':
+                if zone == -1:
+                    if self.rotation_direction != _DIR_LEFT:
                         self.left_rotations += 1
-                        self.rotation_direction = 'left'
-                        feedback_messages.append(f"Left rotation {self.left_rotations}")
+                        self.rotation_direction = _DIR_LEFT
+                        feedback_messages = _left_rotation_msg(self.left_rotations)
                         form_score = 90
                     else:
-                        feedback_messages.append("Good left rotation, now slowly return to center")
+                        feedback_messages = _MSG_HOLD_LEFT
                         form_score = 85
-                elif nose_offset > self.rotation_threshold:
-                    feedback_messages.append("Focus on rotating to your left for now")
+                elif zone == 1:
+                    feedback_messages = _MSG_FOCUS_LEFT
                     form_score = 60
                 else:
-                    self.rotation_direction = None
-                    feedback_messages.append("Now rotate your head to the left")
+                    self.rotation_direction = _DIR_NONE
+                    feedback_messages = _MSG_PROMPT_LEFT
                     form_score = 70
             else:
                 # Second half: focus on right rotations
-                if nose_offset > self.rotation_threshold:
-                    if self.rotation_direction != 'right':
+                if zone == 1:
+                    if self.rotation_direction != _DIR_RIGHT:
                         self.right_rotations += 1
-                        self.rotation_direction = 'right'
-                        feedback_messages.append(f"Right rotation {self.right_rotations}")
+                        self.rotation_direction = _DIR_RIGHT
+                        feedback_messages = _right_rotation_msg(self.right_rotations)
                         form_score = 90
                     else:
-                        feedback_messages.append("Good right rotation, now slowly return to center")
+                        feedback_messages = _MSG_HOLD_RIGHT
                         form_score = 85
-                elif nose_offset < -self.rotation_threshold:
-                    feedback_messages.append("Focus on rotating to your right for now")
+                elif zone == -1:
+                    feedback_messages = _MSG_FOCUS_RIGHT
                     form_score = 60
                 else:
-                    self.rotation_direction = None
-                    feedback_messages.append("Now rotate your head to the right")
+                    self.rotation_direction = _DIR_NONE
+                    feedback_messages = _MSG_PROMPT_RIGHT
                     form_score = 70
-                    
-        elif phase == ExercisePhase.COOLDOWN:
-            total_rotations = self.left_rotations + self.right_rotations
-            feedback_messages.append(f"Excellent! {self.left_rotations} left, {self.right_rotations} right rotations")
+
+        elif phase_code == _COOLDOWN:
+            feedback_messages = _cooldown_msg(self.left_rotations, self.right_rotations)
             form_score = 85
-        
+
         self.rep_count = self.left_rotations + self.right_rotations
         
         return ExerciseAnalysis(
             exercise_name=self.name,
             phase=phase,
             form_score=form_score,
-            feedback_messages=feedback_messages,
+            feedback_messages=self._dedupe_msgs(feedback_messages),
             rep_count=self.rep_count,
             is_proper_position=True,
-            confidence=min(confidence[self.required_keypoints]) * 100,
+            confidence=min_conf * 100,
             exercise_specific_data={
                 "nose_offset": nose_offset,
                 "left_rotations": self.left_rotations,
                 "right_rotations": self.right_rotations,
-                "rotation_direction": self.rotation_direction
+                "rotation_direction": _DIR_NAMES[self.rotation_direction]
             }
         )
\ No newline at end of file
@@ -1,6 +1,67 @@
+import sys
+
 import numpy as np
-from typing import List
-from .base import BaseExercise, ExerciseAnalysis, ExercisePhase
+from functools import cached_property, lru_cache
+from typing import Tuple
+from .base import BaseExercise, ExerciseAnalysis, ExercisePhase, _keypoint_index, njit, _EMPTY_MSGS
+
+# Static feedback tuples, shared across frames (no per-frame allocation);
+# the strings are interned so downstream consumers can identity-compare
+_MSG_NO_VIEW = (sys.intern("Cannot see shoulders clearly"),)
+_MSG_RELAX = (sys.intern("Stand tall with shoulders relaxed"),)
+_MSG_READY = (sys.intern("Get ready to squeeze your shoulder blades"),)
+_MSG_GOOD_SQUEEZE = (sys.intern("Good squeeze! Hold for 2 seconds"),)
+_MSG_HOLD = (sys.intern("Keep holding the squeeze"),)
+_MSG_PROMPT = (sys.intern("Squeeze your shoulder blades together"),)
+
+# Small-int phase codes for hot comparisons
+_SETUP = ExercisePhase.SETUP.code
+_ACTIVE = ExercisePhase.ACTIVE.code
+_COOLDOWN = ExercisePhase.COOLDOWN.code
+
+# KeypointIndex members frozen as module ints on first use — indexing the
+# SoA arrays with bare ints skips the attribute lookups per frame
+_KP_READY = False
+_LEFT_SHOULDER = _RIGHT_SHOULDER = 0
+
+
+def _kp_indices():
+    global _KP_READY, _LEFT_SHOULDER, _RIGHT_SHOULDER
+    KeypointIndex = _keypoint_index()
+    _LEFT_SHOULDER = int(KeypointIndex.LEFT_SHOULDER)
+    _RIGHT_SHOULDER = int(KeypointIndex.RIGHT_SHOULDER)
+    _KP_READY = True
+
+
+@lru_cache(maxsize=64)
+def _rep_msg(n):
+    return (f"Rep {n} complete!",)
+
+
+@lru_cache(maxsize=8)
+def _cooldown_msg(n):
+    return (f"Great work! You completed {n} shoulder squeezes",)
+
+
+@njit(cache=True)
+def _squeeze_frame(left_x: float, right_x: float, baseline: float,
+                   inv_baseline_100: float, in_squeeze: bool):
+    """Numeric core of one squeeze frame: distance, squeeze %, transition
+
+    inv_baseline_100 is 100 / baseline, cached when the baseline is set, so
+    the per-frame path multiplies instead of dividing.
+    Event codes: 0 = no state change, 1 = squeeze started, 2 = rep completed.
+    """
+    distance = abs(left_x - right_x)
+    squeeze_percent = (baseline - distance) * inv_baseline_100
+    squeezing = squeeze_percent > 20.0
+    if squeezing and not in_squeeze:
+        event = 1
+    elif in_squeeze and not squeezing:
+        event = 2
+    else:
+        event = 0
+    return distance, squeeze_percent, squeezing, event
 
 
 class ShoulderSqueezesExercise(BaseExercise):
@@ -14,6 +75,7 @@ class ShoulderSqueezesExercise(BaseExercise):
     def __init__(self):
         super().__init__()
         self.baseline_distance = None
+        self._inv_baseline_100 = 0.0  # 100 / baseline, cached at set time
         self.in_squeeze = False
         self.last_distance = None
         
@@ -25,84 +87,110 @@ class ShoulderSqueezesExercise(BaseExercise):
     def description(self) -> str:
         return "Squeeze your shoulder blades together and hold, then release"
     
-    @property
-    def required_keypoints(self) -> List[int]:
-        from server import KeypointIndex
-        return [KeypointIndex.LEFT_SHOULDER, KeypointIndex.RIGHT_SHOULDER]
+    @cached_property
+    def required_keypoints(self) -> Tuple[int, ...]:
+        if not _KP_READY:
+            _kp_indices()
+        return (_LEFT_SHOULDER, _RIGHT_SHOULDER)
     
-    def analyze(self, keypoints: np.ndarray, confidence: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
-        from server import KeypointIndex
-        
+    def analyze(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, elapsed_time: float) -> ExerciseAnalysis:
+        if not _KP_READY:
+            _kp_indices()
+
         # Update phase
         phase = self.update_phase(elapsed_time)
-        
+
         # Check confidence
-        if not self.check_confidence(confidence, self.required_keypoints):
-            return ExerciseAnalysis(
-                exercise_name=self.name,
-                phase=phase,
-                form_score=0.0,
-                feedback_messages=["Cannot see shoulders clearly"],
-                rep_count=self.rep_count,
-                is_proper_position=False,
-                confidence=0.0,
-                exercise_specific_data={}
-            )
-        
-        # Get shoulder positions
-        left_shoulder = keypoints[KeypointIndex.LEFT_SHOULDER]
-        right_shoulder = keypoints[KeypointIndex.RIGHT_SHOULDER]
-        
-        # Calculate shoulder distance
-        shoulder_distance = abs(left_shoulder[0] - right_shoulder[0])
-        
-        feedback_messages = []
+        if not self.check_confidence(conf):
+            return self._low_confidence_analysis(phase, _MSG_NO_VIEW, self.rep_count)
+
+        # Get shoulder x positions (scalar loads from the SoA arrays)
+        left_x = float(kx[_LEFT_SHOULDER])
+        right_x = float(kx[_RIGHT_SHOULDER])
+        min_conf = float(conf[self._required_idx()].min())
+
+        return self._frame_result(phase, left_x, right_x, elapsed_time, min_conf)
+
+    def analyze_batch(self, kx: np.ndarray, ky: np.ndarray, conf: np.ndarray, t: np.ndarray) -> list:
+        """Vectorized batch analysis of N frames
+
+        Shoulder distances and the confidence gate are computed with a few
+        NumPy ops over the whole batch; the loop only runs the squeeze state
+        machine on precomputed scalars, so results match sequential analyze().
+        """
+        if not _KP_READY:
+            _kp_indices()
+        lx = kx[:, _LEFT_SHOULDER]
+        rx = kx[:, _RIGHT_SHOULDER]
+        min_conf = conf[:, self._required_idx()].min(axis=1)
+        ok = min_conf >= self.confidence_threshold
+
+        results = []
+        for i in range(t.shape[0]):
+            elapsed_time = float(t[i])
+            phase = self.update_phase(elapsed_time)
+            if not ok[i]:
+                results.append(self._low_confidence_analysis(phase, _MSG_NO_VIEW, self.rep_count))
+            else:
+                results.append(self._frame_result(
+                    phase, float(lx[i]), float(rx[i]), elapsed_time, float(min_conf[i])))
+        return results
+
+    def _frame_result(self, phase: ExercisePhase, left_x: float, right_x: float,
+                      elapsed_time: float, min_conf: float, _abs=abs) -> ExerciseAnalysis:
+        """Run the squeeze state machine on one frame's precomputed scalars"""
+        shoulder_distance = _abs(left_x - right_x)
+
+        feedback_messages = _EMPTY_MSGS
         form_score = 70  # Base score
-        
-        if phase == ExercisePhase.SETUP:
+        phase_code = phase.code
+
+        if phase_code == _SETUP:
             # Establish baseline
             if self.baseline_distance is None or elapsed_time < 10:
                 self.baseline_distance = shoulder_distance
-                feedback_messages.append("Stand tall with shoulders relaxed")
+                self._inv_baseline_100 = 100.0 / shoulder_distance if shoulder_distance else 0.0
+                feedback_messages = _MSG_RELAX
             else:
-                feedback_messages.append("Get ready to squeeze your shoulder blades")
-                
-        elif phase == ExercisePhase.ACTIVE:
+                feedback_messages = _MSG_READY
+
+        elif phase_code == _ACTIVE:
             if self.baseline_distance:
-                # Calculate squeeze percentage
-                squeeze_percent = (self.baseline_distance - shoulder_distance) / self.baseline_distance * 100
-                
+                # Numeric core (JIT-compiled when numba is installed)
+                _, squeeze_percent, squeezing, event = _squeeze_frame(
+                    left_x, right_x,
+                    float(self.baseline_distance), self._inv_baseline_100, self.in_squeeze
+                )
+
                 # Detect squeeze (>20% reduction in distance)
-                if squeeze_percent > 20:
-                    if not self.in_squeeze:
-                        self.in_squeeze = True
-                        feedback_messages.append("Good squeeze! Hold for 2 seconds")
-                        form_score = 90
-                    else:
-                        feedback_messages.append("Keep holding the squeeze")
-                        form_score = 85
+                if event == 1:
+                    self.in_squeeze = True
+                    feedback_messages = _MSG_GOOD_SQUEEZE
+                    form_score = 90
+                elif squeezing:
+                    feedback_messages = _MSG_HOLD
+                    form_score = 85
+                elif event == 2:
+                    # Just released
+                    self.rep_count += 1
+                    self.in_squeeze = False
+                    feedback_messages = _rep_msg(self.rep_count)
                 else:
-                    if self.in_squeeze:
-                        # Just released
-                        self.rep_count += 1
-                        self.in_squeeze = False
-                        feedback_messages.append(f"Rep {self.rep_count} complete!")
-                    else:
-                        feedback_messages.append("Squeeze your shoulder blades together")
-                        form_score = 60
-                        
-        elif phase == ExercisePhase.COOLDOWN:
-            feedback_messages.append(f"Great work! You completed {self.rep_count} shoulder squeezes")
+                    feedback_messages = _MSG_PROMPT
+                    form_score = 60
+
+        elif phase_code == _COOLDOWN:
+            feedback_messages = _cooldown_msg(self.rep_count)
             form_score = 85
-        
+
         return ExerciseAnalysis(
             exercise_name=self.name,
             phase=phase,
             form_score=form_score,
-            feedback_messages=feedback_messages,
+            feedback_messages=self._dedupe_msgs(feedback_messages),
             rep_count=self.rep_count,
             is_proper_position=True,
-            confidence=min(confidence[self.required_keypoints]) * 100,
+            confidence=min_conf * 100,
             exercise_specific_data={
                 "shoulder_distance": shoulder_distance,
                 "baseline_distance": self.baseline_distance,
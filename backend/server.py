@@ -1,5 +1,6 @@
 # server.py
 import asyncio, logging, os
+import concurrent.futures
 import numpy as np
 import cv2
 from fastapi import FastAPI, Request
@@ -10,18 +11,21 @@ from aiortc.contrib.media import MediaBlackhole
 from av import VideoFrame
 import math
 from dataclasses import dataclass
+from types import SimpleNamespace
 from typing import Dict, List, Tuple, Optional, AsyncGenerator
 from enum import Enum
 import json
+import orjson
 import base64
+import binascii
 import time
-import io
 
 from fastapi import WebSocket
 from fastapi.websockets import WebSocketDisconnect
 
 # Pose libs
 import torch
+from scipy.signal import resample_poly
 from PIL import Image
 from transformers import AutoProcessor, VitPoseForPoseEstimation
 
@@ -46,6 +50,11 @@ except ImportError:
 
 
 
+# Uvicorn only configures its own loggers, so give the root logger a
+# handler and INFO level here or the pose logs are never emitted
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("pose")
+
 app = FastAPI()
 pcs = set()                         # keep PCs in memory
 
@@ -60,7 +69,44 @@ else:
 print(f"Using device: {device}")
 processor = AutoProcessor.from_pretrained("usyd-community/vitpose-base-simple")
 model = VitPoseForPoseEstimation.from_pretrained("usyd-community/vitpose-base-simple")
-model.to(device).eval()  # .half() commented out
+model.to(device).eval()
+
+# Half-precision weights + channels_last on GPU backends: hits tensor
+# cores and NHWC-optimized kernels; heatmaps are upcast back to float32
+# before post-processing. CPU stays FP32 NCHW.
+if device == "cuda":
+    model = model.to(memory_format=torch.channels_last).half()
+    autocast_dtype = torch.float16
+elif device == "mps":
+    model = model.to(torch.bfloat16)
+    autocast_dtype = torch.bfloat16
+else:
+    autocast_dtype = None
+model_dtype = next(model.parameters()).dtype
+
+# Compile for repeated small-batch inference; "reduce-overhead" captures
+# CUDA graphs to cut kernel-launch latency. Off CUDA, where torch.compile
+# support is limited, TorchScript trace + freeze still buys constant
+# propagation and layer fusion. Either path falls back to eager.
+model_compiled = False
+if device == "cuda":
+    try:
+        model = torch.compile(model, mode="reduce-overhead", fullgraph=False, dynamic=False)
+        model_compiled = True
+        print("Compiled ViTPose with torch.compile(mode='reduce-overhead')")
+    except Exception as e:
+        print(f"⚠️ torch.compile unavailable, running eager: {e}")
+else:
+    try:
+        example = (
+            torch.zeros(1, 3, 256, 192, dtype=model_dtype, device=device),
+            torch.zeros(1, dtype=torch.int64, device=device),
+        )
+        with torch.no_grad():
+            model = torch.jit.freeze(torch.jit.trace(model, example, strict=False))
+        print("Froze ViTPose with torch.jit.trace + torch.jit.freeze")
+    except Exception as e:
+        print(f"⚠️ TorchScript freeze failed, running eager: {e}")
 # ----------------------------------------------------------------------
 
 # COCO pose skeleton connections (standard 17-keypoint format)
@@ -99,62 +145,282 @@ class KeypointIndex:
     LEFT_ANKLE = 15
     RIGHT_ANKLE = 16
 
-# Global data channel reference
-current_data_channel = None
-
 # WebSocket session management
 active_websocket_sessions = set()
 
-def analyze_pose_from_image(image_data: bytes):
+# --- batched pose inference -------------------------------------------
+# Concurrent WebRTC/WebSocket sessions each push their preprocessed frame
+# onto a shared queue and await a future; a background batcher gathers up
+# to _MAX_BATCH frames within a short window and runs one forward pass,
+# amortizing kernel-launch overhead across sessions.
+_MAX_BATCH = 8
+_BATCH_WINDOW = 0.008  # seconds to gather a batch before running it
+_inference_queue: Optional[asyncio.Queue] = None
+_batcher_task = None
+
+# Worker threads for the synchronous processor/model/numpy calls — keeps
+# the asyncio thread free for WebRTC and WebSocket traffic
+_pose_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+
+# Preprocessing constants, allocated once: ViTPose-base input size and the
+# processor's normalization stats folded into a single scale/offset pair
+# (operating directly on uint8 values)
+_INPUT_W, _INPUT_H = 192, 256
+_NORM_MEAN = np.asarray(getattr(processor, "image_mean", [0.485, 0.456, 0.406]),
+                        dtype=np.float32) * 255.0
+_NORM_STD = np.asarray(getattr(processor, "image_std", [0.229, 0.224, 0.225]),
+                       dtype=np.float32) * 255.0
+
+# Crop geometry used by the ViTPose processor (box_to_center_and_scale):
+# aspect ratio is fixed to the model input and the box is padded by 1.25
+_ASPECT_RATIO = _INPUT_W / _INPUT_H
+_BOX_PADDING = 1.25
+_WARP_CACHE: Dict[Tuple[int, int], np.ndarray] = {}
+
+
+def _full_image_warp_matrix(width: int, height: int) -> np.ndarray:
+    """Affine matrix matching the processor's crop for a full-image box
+
+    Ports box_to_center_and_scale (aspect-ratio fix + 1.25 padding) and
+    get_warp_matrix with rotation 0 from the ViTPose image processor, so
+    post_process_pose_estimation inverts the exact same transform. A plain
+    stretch-resize would be decoded through the wrong inverse mapping.
+    """
+    matrix = _WARP_CACHE.get((width, height))
+    if matrix is None:
+        w, h = float(width), float(height)
+        if w > _ASPECT_RATIO * h:
+            h = w / _ASPECT_RATIO
+        elif w < _ASPECT_RATIO * h:
+            w = h * _ASPECT_RATIO
+        target_w = w * _BOX_PADDING
+        target_h = h * _BOX_PADDING
+        scale_x = (_INPUT_W - 1.0) / target_w
+        scale_y = (_INPUT_H - 1.0) / target_h
+        matrix = np.array([
+            [scale_x, 0.0, scale_x * (0.5 * target_w - 0.5 * width)],
+            [0.0, scale_y, scale_y * (0.5 * target_h - 0.5 * height)],
+        ], dtype=np.float32)
+        _WARP_CACHE[(width, height)] = matrix
+    return matrix
+
+
+# dataset_index 0 = COCO; sliced per batch instead of re-allocated
+_DATASET_INDEX = torch.zeros(_MAX_BATCH, dtype=torch.int64, device=device)
+
+# Manually captured CUDA graph for the common single-frame batch; only
+# used when torch.compile (whose reduce-overhead mode captures graphs
+# itself) fell back to eager. Replay cuts the eager forward's Python and
+# kernel-launch overhead to one memcpy plus one graph launch.
+_POSE_GRAPH = None
+_GRAPH_IN = None
+_GRAPH_HEATMAPS = None
+
+
+def _capture_pose_graph():
+    """Capture a batch-1 forward as a CUDA graph (runs in _pose_executor)"""
+    global _POSE_GRAPH, _GRAPH_IN, _GRAPH_HEATMAPS
+    static_in = torch.empty(1, 3, _INPUT_H, _INPUT_W, device=device,
+                            dtype=model_dtype, memory_format=torch.channels_last)
+    with torch.inference_mode():
+        # Warm up on a side stream so capture sees settled allocations
+        side = torch.cuda.Stream()
+        side.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(side):
+            for _ in range(3):
+                model(pixel_values=static_in, dataset_index=_DATASET_INDEX[:1])
+        torch.cuda.current_stream().wait_stream(side)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_out = model(pixel_values=static_in, dataset_index=_DATASET_INDEX[:1])
+    _GRAPH_IN = static_in
+    _GRAPH_HEATMAPS = static_out.heatmaps
+    _POSE_GRAPH = graph
+
+
+def _preprocess_sync(img, boxes):
+    """Preprocessing for one image (runs in _pose_executor)
+
+    RGB ndarrays (the per-frame WebRTC path) take a fast cv2.warpAffine +
+    normalize route — the processor's exact crop geometry, but one warp
+    and one contiguous H2D copy instead of its per-call Python pipeline.
+    PIL images still go through the processor.
+    """
+    if isinstance(img, np.ndarray):
+        height, width = img.shape[:2]
+        resized = cv2.warpAffine(img, _full_image_warp_matrix(width, height),
+                                 (_INPUT_W, _INPUT_H), flags=cv2.INTER_LINEAR)
+        normalized = (resized.astype(np.float32) - _NORM_MEAN) / _NORM_STD
+        tensor = torch.from_numpy(normalized.transpose(2, 0, 1)).unsqueeze(0)
+        if device == "cuda":
+            # Pinned staging + non-blocking copy overlaps the H2D transfer
+            # with the next frame's resize/normalize
+            tensor = tensor.contiguous(memory_format=torch.channels_last).pin_memory()
+            pixel_values = tensor.to(device, non_blocking=True)
+        else:
+            pixel_values = tensor.to(device)
+    else:
+        inputs = processor(images=img, boxes=[boxes], return_tensors="pt").to(device)
+        pixel_values = inputs["pixel_values"]
+    if model_dtype is not torch.float32:
+        pixel_values = pixel_values.to(dtype=model_dtype, memory_format=torch.channels_last)
+    return pixel_values
+
+
+def _forward_sync(pixel_values, boxes):
+    """Model forward + post-processing for one batch (runs in _pose_executor)"""
+    dataset_index = _DATASET_INDEX[:pixel_values.shape[0]]
+    # inference_mode is a strictly cheaper autograd-off path than
+    # no_grad (no version-counter bookkeeping on the activations)
+    with torch.inference_mode():
+        if _POSE_GRAPH is not None and pixel_values.shape[0] == 1:
+            _GRAPH_IN.copy_(pixel_values)
+            _POSE_GRAPH.replay()
+            # .float() copies out of the static graph output buffer
+            outputs = SimpleNamespace(heatmaps=_GRAPH_HEATMAPS.float())
+        elif autocast_dtype is not None:
+            with torch.autocast(device_type=device, dtype=autocast_dtype):
+                outputs = model(pixel_values=pixel_values, dataset_index=dataset_index)
+        else:
+            outputs = model(pixel_values=pixel_values, dataset_index=dataset_index)
+        if isinstance(outputs, dict):
+            # The TorchScript-traced forward returns a plain dict
+            outputs = SimpleNamespace(**outputs)
+        if autocast_dtype is not None:
+            # Upcast so post-processing sees FP32-compatible tensors
+            outputs.heatmaps = outputs.heatmaps.float()
+        pose_results = processor.post_process_pose_estimation(outputs, boxes=boxes)
+    # post_process_pose_estimation already lands its tensors on the host
+    # (the D2H transfer happens on the heatmaps inside it), so this just
+    # exposes the (17, 2) slice as numpy for the serialization path
+    for image_results in pose_results:
+        for person in image_results:
+            person["keypoints"] = person["keypoints"][:, :2].numpy()
+    return pose_results
+
+
+async def run_pose_inference(img):
+    """Queue one image (PIL or RGB ndarray) for the shared batcher and await its pose results"""
+    if isinstance(img, np.ndarray):
+        height, width = img.shape[:2]
+    else:
+        width, height = img.size
+    # Use entire image as bounding box - format: [[x1, y1, w, h]] (COCO format)
+    boxes = [[0, 0, width, height]]
+    loop = asyncio.get_running_loop()
+    pixel_values = await loop.run_in_executor(_pose_executor, _preprocess_sync, img, boxes)
+    future = loop.create_future()
+    await _inference_queue.put((pixel_values, boxes, future))
+    return await future
+
+
+async def _pose_batcher():
+    """Gather queued frames for up to _BATCH_WINDOW and run one forward pass"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _inference_queue.get()]
+        deadline = time.monotonic() + _BATCH_WINDOW
+        while len(batch) < _MAX_BATCH:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_inference_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            pixel_values = torch.cat([item[0] for item in batch], dim=0)
+            pose_results = await loop.run_in_executor(
+                _pose_executor, _forward_sync, pixel_values, [item[1] for item in batch]
+            )
+            for result, (_, _, future) in zip(pose_results, batch):
+                if not future.done():
+                    # Keep the single-image list shape callers index with [0]
+                    future.set_result([result])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+@app.on_event("startup")
+async def start_pose_batcher():
+    global _inference_queue, _batcher_task
+    _inference_queue = asyncio.Queue()
+    _batcher_task = asyncio.create_task(_pose_batcher())
+
+    # One-time CUDA tuning: fixed input shapes let cuDNN pick its best
+    # algorithms once, and capping the memory pool leaves headroom for
+    # the WebRTC stack on shared GPUs
+    if device == "cuda":
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
+        torch.cuda.set_per_process_memory_fraction(0.8)
+
+    # Warm up the compiled model so the first client frame does not pay
+    # the compile/graph-capture cost (can be tens of seconds)
+    try:
+        dummy = Image.new("RGB", (640, 480))
+        for _ in range(3):
+            await run_pose_inference(dummy)
+        print("Pose model warm-up complete")
+    except Exception as e:
+        print(f"⚠️ Pose model warm-up failed: {e}")
+
+    # Without torch.compile, capture the batch-1 forward as a CUDA graph
+    if device == "cuda" and not model_compiled:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                _pose_executor, _capture_pose_graph)
+            print("Captured batch-1 CUDA graph for pose forwards")
+        except Exception as e:
+            print(f"⚠️ CUDA graph capture failed, staying eager: {e}")
+
+
+async def analyze_pose_from_image(image_data: bytes):
     """
     Extract pose keypoints and exercise analysis from image data
-    
+
     Args:
         image_data: Raw image bytes (JPEG format)
         exercise_type: Type of exercise to analyze
-        
+
     Returns:
         dict: Keypoint data and exercise analysis
     """
     try:
-        # Convert bytes to PIL Image
-        img = Image.open(io.BytesIO(image_data))
-        width, height = img.size
-        
-        # Use entire image as bounding box - format: [[x1, y1, w, h]] (COCO format)
-        boxes = [[0, 0, width, height]]
-        inputs = processor(images=img, boxes=[boxes], return_tensors="pt").to(device)
-        
-        # Add dataset_index for COCO dataset (index 0) as tensor
-        inputs["dataset_index"] = torch.tensor(0, device=device)
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-        
-        pose_results = processor.post_process_pose_estimation(outputs, boxes=[boxes])
-        
+        # Decode JPEG via cv2 (libjpeg-turbo SIMD path, ~2-3x faster than PIL)
+        arr = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+        if arr is None:
+            raise ValueError("could not decode image data")
+        arr = cv2.cvtColor(arr, cv2.COLOR_BGR2RGB)
+        height, width = arr.shape[:2]
+
+        pose_results = await run_pose_inference(arr)
+
         # Extract keypoints
         if pose_results and len(pose_results[0]) > 0:
-            kp = pose_results[0][0]["keypoints"]  # First image, first person
-            keypoints_xy = kp[:, :2].cpu().numpy()  # (17, 2) x,y coordinates
-            confidence = np.ones(len(keypoints_xy)) * 0.8  # Default confidence of 0.8
+            # First image, first person; already host numpy from the batcher
+            keypoints_xy = pose_results[0][0]["keypoints"]  # (17, 2) x,y coordinates
+            confidence = _DEFAULT_CONF  # Default confidence of 0.8
         else:
             # No pose detected, create empty arrays
             keypoints_xy = np.zeros((17, 2))
             confidence = np.zeros(17)
         
-        # Return keypoint data
+        # Return keypoint data (numpy arrays; orjson serializes them directly)
         return {
             "type": "keypoints",
-            "keypoints": keypoints_xy.tolist(),
-            "confidence": confidence.tolist(),
+            "keypoints": keypoints_xy,
+            "confidence": confidence,
             "timestamp": time.time(),
             "frame_width": width,
             "frame_height": height
         }
         
     except Exception as e:
-        print(f"❌ Error analyzing pose: {e}")
+        logger.error("Error analyzing pose: %s", e)
         return {
             "type": "error",
             "message": str(e),
@@ -306,6 +572,25 @@ if AGENTS_SDK_AVAILABLE:
 # Global voice coach instance
 agent_voice_coach = AgentVoiceCoach() if AGENTS_SDK_AVAILABLE else None
 
+# Persistent buffers for the supervision conversion (one person, 17 kps)
+# — refilled in place each frame instead of reshape/astype copies
+_XY_BUF = np.empty((1, 17, 2), dtype=np.float32)
+_CONF_BUF = np.empty((1, 17), dtype=np.float32)
+
+# ViTPose provides no per-keypoint confidence; share one default array
+_DEFAULT_CONF = np.full(17, 0.8, dtype=np.float32)
+
+# Mean 32x32 absdiff below which a frame counts as unchanged and the
+# previous keypoints are resent instead of running a fresh forward
+_STILL_FRAME_DIFF = 2.0
+
+# Precomputed envelope for the per-frame keypoint message — the keys and
+# layout never change, so only the payload bytes are produced per frame
+_KP_PREFIX = b'{"type":"keypoints","keypoints":'
+_KP_MID = b',"confidence":'
+_KP_SUFFIX = b',"timestamp":%.6f,"frame_width":%d,"frame_height":%d}'
+
+
 def create_supervision_keypoints(keypoints_array, confidence_array):
     """
     Convert ViTPose keypoints to supervision KeyPoints format
@@ -315,26 +600,26 @@ def create_supervision_keypoints(keypoints_array, confidence_array):
         confidence_array: numpy array of shape (17,) with confidence scores
     
     Returns:
-        supervision KeyPoints object
+        supervision KeyPoints object (views over the persistent buffers)
     """
-    # Reshape to supervision format: (1, 17, 2) for one person
-    xy = keypoints_array.reshape(1, 17, 2)
-    
-    # Confidence scores
-    confidence = confidence_array.reshape(1, 17)
-    
-    # Create KeyPoints object
-    keypoints = sv.KeyPoints(
-        xy=xy.astype(np.float32),
-        confidence=confidence.astype(np.float32)
-    )
-    
-    return keypoints
+    _XY_BUF[0] = keypoints_array
+    _CONF_BUF[0] = confidence_array
+    return sv.KeyPoints(xy=_XY_BUF, confidence=_CONF_BUF)
+
+# Annotators are stateless across frames — build them once at import.
+# The skeleton edge list is frozen as an int32 array at the same time.
+_COCO_SKELETON_NP = np.asarray(COCO_SKELETON, dtype=np.int32)
+VERTEX_ANNOTATOR = sv.VertexAnnotator(color=sv.Color.WHITE, radius=5)
+EDGE_ANNOTATOR = sv.EdgeAnnotator(color=sv.Color.WHITE, thickness=3, edges=_COCO_SKELETON_NP)
+
 
 def draw_pose_annotations(frame_np, keypoints_array, confidence_array, confidence_threshold=0.3):
     """
     Draw pose annotations on frame using supervision library
-    
+
+    Annotates frame_np in place — the caller owns the array (it comes from
+    VideoFrame.to_ndarray), so no defensive copy is made.
+
     Args:
         frame_np: numpy array representing the frame (H, W, 3)
         keypoints_array: numpy array of shape (17, 2) with x,y coordinates  
@@ -346,34 +631,15 @@ def draw_pose_annotations(frame_np, keypoints_array, confidence_array, confidenc
     """
     # Convert to supervision keypoints
     keypoints = create_supervision_keypoints(keypoints_array, confidence_array)
-    
-    # Use default white colors
-    vertex_color = sv.Color.WHITE
-    edge_color = sv.Color.WHITE
-    
-    # Create annotators
-    vertex_annotator = sv.VertexAnnotator(
-        color=vertex_color,
-        radius=5
-    )
-    
-    edge_annotator = sv.EdgeAnnotator(
-        color=edge_color, 
-        thickness=3,
-        edges=COCO_SKELETON
-    )
-    
-    # Apply annotations
-    annotated_frame = frame_np.copy()
-    
+
     # Draw skeleton (edges between keypoints)
-    annotated_frame = edge_annotator.annotate(
-        scene=annotated_frame,
+    annotated_frame = EDGE_ANNOTATOR.annotate(
+        scene=frame_np,
         key_points=keypoints
     )
     
     # Draw keypoints (vertices)
-    annotated_frame = vertex_annotator.annotate(
+    annotated_frame = VERTEX_ANNOTATOR.annotate(
         scene=annotated_frame,
         key_points=keypoints
     )
@@ -385,105 +651,101 @@ def draw_pose_annotations(frame_np, keypoints_array, confidence_array, confidenc
 
 class PoseTrack(VideoStreamTrack):
     """Pass-through video track that also runs pose estimation and sends keypoint data via data channel."""
-    def __init__(self, track, data_channel=None, enable_annotations=False, exercise_type="shoulder_squeezes"):
+    def __init__(self, track, get_channel=None, enable_annotations=False, exercise_type="shoulder_squeezes"):
         super().__init__()
         self.track = track
-        self.data_channel = data_channel
+        # Callable returning this connection's data channel (set after the
+        # track callback fires, so it cannot be captured at construction)
+        self.get_channel = get_channel or (lambda: None)
         self.enable_annotations = enable_annotations
         self.exercise_type = exercise_type
+        self._frames_sent = 0  # for rate-limited info logging
+        self._prev_small = None  # 32x32 thumbnail of the previous frame
+        self._last_kp = None  # keypoints from the last real forward
+        self._last_conf = None
 
     async def recv(self):
-        print(f"🎥 PoseTrack.recv() called - waiting for frame from client...")
         try:
             frame: VideoFrame = await self.track.recv()     # incoming video frame
-            print(f"🎥 Received frame from client: {frame.width}x{frame.height}, pts={frame.pts}")
+            logger.debug("Received frame from client: %dx%d, pts=%s",
+                         frame.width, frame.height, frame.pts)
         except Exception as e:
-            print(f"❌ Error receiving frame from client: {e}")
+            logger.error("Error receiving frame from client: %s", e)
             raise
         
-        # --- Pose inference with full image bounding box --------------
-        img = frame.to_image()                          # PIL.Image
-        width, height = img.size
-        # Use entire image as bounding box - format: [[x1, y1, w, h]] (COCO format)
-        boxes = [[0, 0, width, height]]
-        inputs = processor(images=img, boxes=[boxes], return_tensors="pt").to(device)
-        # Convert inputs to half precision to match model (commented out)
-        # for key in inputs:
-        #     if inputs[key].dtype == torch.float32:
-        #         inputs[key] = inputs[key].half()
-        # Add dataset_index for COCO dataset (index 0) as tensor
-        inputs["dataset_index"] = torch.tensor(0, device=device)
-        with torch.no_grad():
-            outputs = model(**inputs)
-            # Convert outputs back to float32 for post-processing compatibility (commented out)
-            # for key in outputs:
-            #     if hasattr(outputs[key], 'dtype') and outputs[key].dtype == torch.float16:
-            #         outputs[key] = outputs[key].float()
-        pose_results = processor.post_process_pose_estimation(outputs, boxes=[boxes])
-        
-        # Extract keypoints using the correct format for supervision
-        if pose_results and len(pose_results[0]) > 0:
-            kp = pose_results[0][0]["keypoints"]  # First image, first person
-            keypoints_xy = kp[:, :2].cpu().numpy()  # (17, 2) x,y coordinates
-            # ViTPose doesn't provide confidence scores per keypoint, so we'll use a default
-            confidence = np.ones(len(keypoints_xy)) * 0.8  # Default confidence of 0.8
+        # --- Pose inference through the shared batcher ----------------
+        # to_ndarray avoids the PIL round-trip (one copy instead of three)
+        arr = frame.to_ndarray(format="rgb24")
+        height, width = arr.shape[:2]
+
+        # Scene-change gate: a 32x32 absdiff against the previous frame
+        # decides whether this frame needs a fresh forward at all
+        small = cv2.resize(arr, (32, 32), interpolation=cv2.INTER_AREA)
+        if self._prev_small is not None and self._last_kp is not None:
+            diff = float(cv2.absdiff(small, self._prev_small).mean())
         else:
-            # No pose detected, create empty arrays
-            keypoints_xy = np.zeros((17, 2))
-            confidence = np.zeros(17)
+            diff = math.inf
+        self._prev_small = small
+
+        if diff < _STILL_FRAME_DIFF:
+            # Frame is effectively static — resend the cached keypoints
+            # (the message below carries a fresh timestamp)
+            keypoints_xy = self._last_kp
+            confidence = self._last_conf
+        else:
+            pose_results = await run_pose_inference(arr)
+
+            # Extract keypoints using the correct format for supervision
+            if pose_results and len(pose_results[0]) > 0:
+                # First image, first person; already host numpy from the batcher
+                keypoints_xy = pose_results[0][0]["keypoints"]  # (17, 2) x,y coordinates
+                # ViTPose doesn't provide confidence scores per keypoint, so we'll use a default
+                confidence = _DEFAULT_CONF  # Default confidence of 0.8
+            else:
+                # No pose detected, create empty arrays
+                keypoints_xy = np.zeros((17, 2))
+                confidence = np.zeros(17)
+            self._last_kp = keypoints_xy
+            self._last_conf = confidence
         
         # Exercise analysis now done on iOS client
-        print(f"Detected pose with {len(keypoints_xy)} keypoints")
+        logger.debug("Detected pose with %d keypoints", len(keypoints_xy))
         
-        print("key-points:", keypoints_xy)      # Debug output
-        print("confidence:", confidence)
-        
-        # Send keypoint data via data channel to iOS (use global channel reference)
-        global current_data_channel
-        if current_data_channel:
+        # Send keypoint data via this connection's data channel to iOS
+        channel = self.get_channel()
+        if channel:
             try:
-                keypoint_data = {
-                    "type": "keypoints",
-                    "keypoints": keypoints_xy.tolist(),  # Convert numpy to list for JSON
-                    "confidence": confidence.tolist(),
-                    "timestamp": time.time(),
-                    "frame_width": width,  # Add frame dimensions
-                    "frame_height": height,
-                    # Exercise analysis removed - now handled on iOS
-                }
-                
-                import json
-                message = json.dumps(keypoint_data)
-                current_data_channel.send(message)
-                print(f"📡 ✅ Sent keypoint data: {len(keypoints_xy)} keypoints")
+                # Splice the two numpy payloads into the static envelope —
+                # no per-frame dict, three C-level serializations total
+                message = (
+                    _KP_PREFIX
+                    + orjson.dumps(keypoints_xy, option=orjson.OPT_SERIALIZE_NUMPY)
+                    + _KP_MID
+                    + orjson.dumps(confidence, option=orjson.OPT_SERIALIZE_NUMPY)
+                    + _KP_SUFFIX % (time.time(), width, height)
+                ).decode()
+                channel.send(message)
+                self._frames_sent += 1
+                if self._frames_sent % 300 == 1:  # ~every 10 s at 30 fps
+                    logger.info("Sent keypoint data for %d frames", self._frames_sent)
             except Exception as e:
-                print(f"❌ Failed to send keypoint data: {e}")
+                logger.error("Failed to send keypoint data: %s", e)
         else:
-            print("⚠️ No data channel available yet")
+            logger.debug("No data channel available yet")
         
-        # Convert frame to numpy for annotation (fallback rendering - should be disabled)
+        # Annotate directly on the RGB array (fallback rendering - should be disabled)
         if self.enable_annotations:
-            # Convert PIL to numpy array (RGB -> BGR for OpenCV)
-            frame_np = np.array(img)
-            frame_np = cv2.cvtColor(frame_np, cv2.COLOR_RGB2BGR)
-            
-            # Draw pose annotations
-            annotated_frame = draw_pose_annotations(frame_np, keypoints_xy, confidence)
-            
-            # Convert back to PIL then to VideoFrame
-            annotated_frame_rgb = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
-            annotated_pil = Image.fromarray(annotated_frame_rgb)
-            
-            # Create new VideoFrame from annotated image
-            new_frame = VideoFrame.from_image(annotated_pil)
+            # supervision draws white keypoints/edges, so channel order is moot
+            annotated_frame = draw_pose_annotations(arr, keypoints_xy, confidence)
+
+            # Create new VideoFrame straight from the annotated array
+            new_frame = VideoFrame.from_ndarray(annotated_frame, format="rgb24")
             new_frame.pts = frame.pts
             new_frame.time_base = frame.time_base
-            
-            print(f"🎥 Returning processed frame to client: {new_frame.width}x{new_frame.height}, pts={new_frame.pts}")
+
             return new_frame
         else:
             # Return original frame unchanged (raw camera feed)
-            print(f"🎥 Returning original frame to client: {frame.width}x{frame.height}, pts={frame.pts}")
             return frame
 
 
@@ -542,36 +804,34 @@ async def offer(request: Request):
 
     pc = RTCPeerConnection()
     pcs.add(pc)
-    
-    # Store peer connection reference globally
-    global current_data_channel
-    current_data_channel = None
+
+    # Data channel scoped to this peer connection — concurrent clients no
+    # longer overwrite each other's channel
+    pc._pose_channel = None
 
     @pc.on("datachannel")
     def on_datachannel(channel):
-        print(f"📡 Received data channel from client: {channel.label}")
-        global current_data_channel
-        current_data_channel = channel
+        logger.info("Received data channel from client: %s", channel.label)
+        pc._pose_channel = channel
         
         @channel.on("open")
         def on_open():
-            print(f"📡 Data channel opened: {channel.label}")
+            logger.info("Data channel opened: %s", channel.label)
         
         @channel.on("message")
         def on_message(message):
-            print(f"📡 Received data channel message: {message}")
+            logger.debug("Received data channel message: %s", message)
 
     @pc.on("track")
     def on_track(track):
-        print(f"🎥 Backend received track: kind={track.kind}, id={track.id}")
+        logger.info("Backend received track: kind=%s, id=%s", track.kind, track.id)
         if track.kind == "video":
-            print(f"🎥 Adding PoseTrack")
             # IMPORTANT: Disable annotations completely - send raw video only
-            pose_track = PoseTrack(track, data_channel=current_data_channel, enable_annotations=False)
+            pose_track = PoseTrack(track, get_channel=lambda: pc._pose_channel, enable_annotations=False)
             pc.addTrack(pose_track)
-            print(f"🎥 PoseTrack added to peer connection with data channel")
+            logger.info("PoseTrack added to peer connection with data channel")
         else:
-            print(f"🎵 Ignoring audio track: {track.id}")
+            logger.info("Ignoring audio track: %s", track.id)
             MediaBlackhole().addTrack(track)
 
     await pc.setRemoteDescription(offer)
@@ -585,7 +845,7 @@ async def offer(request: Request):
 async def pose_analysis_endpoint(websocket: WebSocket):
     """WebSocket endpoint for pose analysis - receives images, returns keypoint data"""
     await websocket.accept()
-    print("📡 New pose analysis WebSocket connection established")
+    logger.info("New pose analysis WebSocket connection established")
     active_websocket_sessions.add(websocket)
     
     try:
@@ -597,26 +857,27 @@ async def pose_analysis_endpoint(websocket: WebSocket):
                 if "bytes" in message:
                     # Received image data
                     image_data = message["bytes"]
-                    print(f"📡 Received image data: {len(image_data)} bytes")
+                    logger.debug("Received image data: %d bytes", len(image_data))
                     
                     # Analyze pose
-                    result = analyze_pose_from_image(image_data)
+                    result = await analyze_pose_from_image(image_data)
                     
                     # Send result back to client
-                    await websocket.send_text(json.dumps(result))
+                    await websocket.send_text(
+                        orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY).decode())
                     
                 elif "text" in message:
                     # Received text message
                     try:
                         data = json.loads(message["text"])
-                        print(f"📡 Received text message: {data}")
+                        logger.debug("Received text message: %s", data)
                     except json.JSONDecodeError:
-                        print(f"❌ Invalid JSON received: {message['text']}")
+                        logger.warning("Invalid JSON received: %s", message['text'])
                         
     except WebSocketDisconnect:
-        print("📡 Pose analysis WebSocket disconnected")
+        logger.info("Pose analysis WebSocket disconnected")
     except Exception as e:
-        print(f"❌ Error in pose analysis WebSocket: {e}")
+        logger.error("Error in pose analysis WebSocket: %s", e)
         try:
             await websocket.send_text(json.dumps({
                 "type": "error",
@@ -627,6 +888,20 @@ async def pose_analysis_endpoint(websocket: WebSocket):
     finally:
         active_websocket_sessions.discard(websocket)
 
+def _upsample_16k_to_24k(pcm: np.ndarray) -> np.ndarray:
+    """Anti-aliased polyphase 16 kHz -> 24 kHz resample for the Agents SDK
+
+    The FIR ringing can overshoot full scale by a few percent, so clip
+    before the int16 cast — a bare cast wraps to the opposite sign.
+    """
+    return np.clip(resample_poly(pcm, up=3, down=2), -32768, 32767).astype(np.int16)
+
+
+def _downsample_24k_to_16k(pcm: np.ndarray) -> np.ndarray:
+    """Anti-aliased polyphase 24 kHz -> 16 kHz resample for the frontend"""
+    return np.clip(resample_poly(pcm, up=2, down=3), -32768, 32767).astype(np.int16)
+
+
 @app.websocket("/voice-coach-agents")
 async def voice_coach_agents_endpoint(websocket: WebSocket):
     """Enhanced voice coaching using OpenAI Agents SDK"""
@@ -656,16 +931,19 @@ async def voice_coach_agents_endpoint(websocket: WebSocket):
                 if data.get("type") == "audio_data":
                     # Convert base64 audio to numpy array with proper format for Agents SDK
                     audio_b64 = data.get("audio", "")
-                    audio_bytes = base64.b64decode(audio_b64)
-                    
+                    # a2b_base64 skips b64decode's validation layers (~2x
+                    # faster) and frombuffer views the bytes in place, so the
+                    # decode output is the only per-chunk allocation left
+                    audio_bytes = binascii.a2b_base64(audio_b64)
+
                     # Convert PCM16 to int16 format (Agents SDK expects int16 at 24kHz)
                     pcm16_array = np.frombuffer(audio_bytes, dtype=np.int16)
-                    
-                    # Resample from 16kHz to 24kHz for Agents SDK
-                    # Simple linear interpolation upsampling (16kHz -> 24kHz = 1.5x)
-                    target_length = int(len(pcm16_array) * 1.5)
-                    indices = np.linspace(0, len(pcm16_array) - 1, target_length)
-                    resampled_audio = np.interp(indices, np.arange(len(pcm16_array)), pcm16_array).astype(np.int16)
+
+                    # Resample from 16kHz to 24kHz for Agents SDK in a worker
+                    # thread (FIR polyphase filter, C implementation)
+                    loop = asyncio.get_running_loop()
+                    resampled_audio = await loop.run_in_executor(
+                        None, _upsample_16k_to_24k, pcm16_array)
                     
                     # Ensure we have a reasonable amount of audio data
                     if len(resampled_audio) > 240:  # At least 10ms at 24kHz
@@ -673,14 +951,13 @@ async def voice_coach_agents_endpoint(websocket: WebSocket):
                             # Process with Agents SDK and stream response
                             async for audio_chunk in agent_voice_coach.process_audio(resampled_audio):
                                 # Agents SDK returns int16 at 24kHz, downsample to 16kHz for frontend
-                                # Simple decimation downsampling (24kHz -> 16kHz = 2/3)
                                 if len(audio_chunk) > 0:
-                                    # Take every 3rd sample and keep 2 (2/3 ratio)
-                                    indices = np.arange(0, len(audio_chunk), 3/2).astype(int)
-                                    indices = indices[indices < len(audio_chunk)]
-                                    downsampled_chunk = audio_chunk[indices]
+                                    downsampled_chunk = await loop.run_in_executor(
+                                        None, _downsample_24k_to_16k, audio_chunk)
+
                                     
-                                    audio_b64 = base64.b64encode(downsampled_chunk.tobytes()).decode()
+                                    # b2a_base64 reads the array buffer directly (no tobytes copy)
+                                    audio_b64 = binascii.b2a_base64(downsampled_chunk, newline=False).decode()
                                     await websocket.send_text(json.dumps({
                                         "type": "audio_response",
                                         "audio": audio_b64,
@@ -731,6 +1008,8 @@ async def voice_coach_basic_endpoint(websocket: WebSocket):
 
 @app.on_event("shutdown")
 async def shutdown():
+    if _batcher_task:
+        _batcher_task.cancel()
     await asyncio.gather(*[pc.close() for pc in pcs])
     pcs.clear()
 